@@ -0,0 +1,247 @@
+#!/usr/bin/python3
+
+# An IntervalDict is a set of disjoint, non-empty, valued intervals of the
+# natural numbers, stored in a SortedDict as begin -> (end, value).  Unlike an
+# IntervalMap, it has no background value: integers not covered by any
+# interval are simply absent from the dictionary, and lookups report them as
+# gaps (None).
+#
+# add(ival) paints [ival.begin, ival.end) with ival.value, chopping the
+# intervals that it overlaps; remove(ival) and chop(begin, end) just chop.
+# Adjacent intervals are coalesced only if they have the same value, and that
+# value is one of coalescing_values; otherwise, every add()ed interval keeps
+# its own boundaries until it is chopped.
+#
+# get(loc, ...) takes the same coalescing options as IntervalMap.get(), with
+# gaps taking the role of the background value None.  get_sorted(locs, ...)
+# looks up many sorted locs at once.
+#
+# If this file is run as main, it will run a random test case generator that
+# checks an IntervalDict against a non-coalescing IntervalMap.
+
+from sortedcontainers import SortedDict
+import random
+
+class IntervalDict:
+    def __init__(self, ival_type, *, coalescing_values=()):
+        self.d = SortedDict()
+        self._ival_type = ival_type
+        self._coalescing_values = frozenset(coalescing_values)
+        self._value_bits = {}
+
+    def __len__(self):
+        return len(self.d)
+
+    # The bitmask of values, giving each value a bit of its own on first sight
+    def _values_mask(self, values):
+        bits = self._value_bits
+        mask = 0
+        for v in values:
+            b = bits.get(v)
+            if b is None:
+                b = bits[v] = 1 << len(bits)
+            mask |= b
+        return mask
+
+
+    def add(self, ival):
+        (begin, end, v) = (ival.begin, ival.end, ival.value)
+        self.chop(begin, end)
+        if begin >= end:
+            return
+        d = self.d
+        if v in self._coalescing_values:
+            if end in d and d[end][1] == v:
+                (end, _) = d.pop(end)
+            ix = d.bisect_left(begin)
+            if ix:
+                kl = d.keys()[ix - 1]
+                if d[kl] == (begin, v):
+                    begin = kl
+        d[begin] = (end, v)
+
+    def remove(self, ival):
+        self.chop(ival.begin, ival.end)
+
+    def chop(self, begin, end):
+        d = self.d
+        ix = d.bisect_right(begin)
+        if ix:
+            # Truncate the interval straddling begin, if any
+            kl = d.keys()[ix - 1]
+            (el, vl) = d[kl]
+            if el > begin:
+                if kl < begin:
+                    d[kl] = (begin, vl)
+                else:
+                    del d[kl]
+                if el > end:
+                    d[end] = (el, vl)
+                    return
+        olaps = list(d.irange(begin, end, inclusive=(False, False)))
+        for k in olaps:
+            (ek, vk) = d.pop(k)
+        if olaps and ek > end:
+            d[end] = (ek, vk)
+
+
+    def get(self, loc, *, coalesce_with_values=(), coalesce_with_self_and_values=(),
+                          coalesce_beyond_values=(), coalesce_beyond_self_and_values=()):
+        d = self.d
+        ix = d.bisect_right(loc)
+        if not ix:
+            return None
+        base = d.keys()[ix - 1]
+        (end, v) = d[base]
+        if end <= loc:
+            return None
+
+        # The sets of values to coalesce with, or beyond, are bitmasks over the
+        # bits of the values they name; other values have no bit.
+        bits = self._value_bits
+        mask_coalesced = self._values_mask(coalesce_with_values)
+        if coalesce_with_self_and_values:
+            mask_coalesced |= self._values_mask((v,)) | self._values_mask(coalesce_with_self_and_values)
+        if not mask_coalesced:
+            return self._ival_type(base, end, v)
+
+        mask_allowed = self._values_mask(coalesce_beyond_values)
+        if coalesce_beyond_self_and_values:
+            mask_allowed |= self._values_mask((v,)) | self._values_mask(coalesce_beyond_self_and_values)
+        mask_allowed &= ~mask_coalesced
+
+        # Walk left, then right, over the spans, intervals or gaps, of coalesced
+        # or allowed value, and trim back to the outermost span of coalesced
+        # value.  Each walk steps through the sorted keys from a single
+        # bisection.  There are no gaps beyond the first or the last interval.
+        mask_walked = mask_coalesced | mask_allowed
+        bit_gap = bits.get(None, 0)
+        backup = base
+        bfirst = bits.get(v, 0)
+        for k in d.irange(maximum=base, inclusive=(True, False), reverse=True):
+            (e, vk) = d[k]
+            if e < base:
+                if not bit_gap & mask_walked:
+                    break
+                (base, bfirst) = (e, bit_gap)
+                if bit_gap & mask_coalesced:
+                    backup = base
+            bk = bits.get(vk, 0)
+            if not bk & mask_walked:
+                break
+            (base, bfirst) = (k, bk)
+            if bk & mask_coalesced:
+                backup = base
+        if not bfirst & mask_coalesced and bfirst & mask_allowed:
+            base = backup
+
+        backup = end
+        blast = bits.get(v, 0)
+        for k in d.irange(minimum=end):
+            if k > end:
+                if not bit_gap & mask_walked:
+                    break
+                (end, blast) = (k, bit_gap)
+                if bit_gap & mask_coalesced:
+                    backup = end
+            (e, vk) = d[k]
+            bk = bits.get(vk, 0)
+            if not bk & mask_walked:
+                break
+            (end, blast) = (e, bk)
+            if bk & mask_coalesced:
+                backup = end
+        if not blast & mask_coalesced and blast & mask_allowed:
+            end = backup
+
+        return self._ival_type(base, end, v)
+
+
+    # The distinct intervals that get(loc, ...) returns for the sorted locs,
+    # in a single pass: a loc covered by the last interval returned is not
+    # looked up again, which is exact as long as the locs share their value.
+    # Locs in gaps are skipped.
+    def get_sorted(self, locs, **kwds):
+        ret = []
+        for loc in locs:
+            if ret and loc < ret[-1].end:
+                continue
+            ival = self.get(loc, **kwds)
+            if ival is not None:
+                ret.append(ival)
+        return ret
+
+
+    def __getitem__(self, loc):
+        d = self.d
+        if isinstance(loc, slice):
+            # The keys are kept sorted in contiguous lists, so bisect for the
+            # positions of the bounds and slice the keys in between
+            keys = d.keys()
+            ix = d.bisect_right(loc.start) if loc.start is not None else 0
+            jx = d.bisect_left(loc.stop) if loc.stop is not None else len(d)
+            # Include the interval straddling start, if any
+            iy = ix - 1 if ix and d[keys[ix - 1]][0] > loc.start else ix
+            ival_type = self._ival_type
+            return [ival_type(k, *d[k]) for k in keys[iy:max(ix, jx)]]
+        else:
+            ix = d.bisect_right(loc)
+            if ix:
+                k = d.keys()[ix - 1]
+                (e, v) = d[k]
+                if e > loc:
+                    return self._ival_type(k, e, v)
+            return None
+
+    def __iter__(self):
+        return (self._ival_type(k, e, v) for k, (e, v) in self.d.items())
+
+
+if __name__ == "__main__":
+    from collections import namedtuple
+    from intervalmap import IntervalMap
+
+    Ival = namedtuple('Ival', 'begin end value')
+
+    lim = 1000
+    ops = 20000
+    vals = ['a', 'b', 'c']
+    im = IntervalMap.from_valued_interval_domain(Ival(0, lim, None), coalescing=False)
+    idict = IntervalDict(Ival)
+    cdict = IntervalDict(Ival, coalescing_values=('a',))
+
+    def check(loc):
+        (i, j) = (im[loc], idict[loc])
+        assert (j is None) if i.value is None else tuple(i) == tuple(j), (loc, i, j)
+        for kwds in ({'coalesce_with_self_and_values': ('b',), 'coalesce_beyond_values': (None,)},
+                     {'coalesce_with_values': ('a',), 'coalesce_beyond_values': ('c',)}):
+            (i, j) = (im.get(loc, **kwds), idict.get(loc, **kwds))
+            assert (j is None) if i.value is None else tuple(i) == tuple(j), (loc, kwds, i, j)
+            # Lookups around locs of the same value give the same intervals
+            locs = [l for l in sorted(random.sample(range(lim), 10)) if (idict[l] or Ival(0, 0, None)).value == 'a']
+            ivals = [i for i in (idict.get(l, **kwds) for l in locs) if i is not None]
+            assert [tuple(i) for i in idict.get_sorted(locs, **kwds)] == sorted(set(tuple(i) for i in ivals))
+
+    for n in range(1, ops):
+        loc = random.randint(0, lim - 2)
+        sz = random.randint(1, min(lim - loc - 1, 50))
+        v = random.choice(vals + [None])
+        print("Painting [%d+%d] %s" % (loc, sz, v))
+        # Paint through a scratch value, as the IntervalMap refuses to conceal
+        # an interval under another of the same value
+        im.mark(loc, sz, '')
+        im.mark(loc, sz, v)
+        for dct in (idict, cdict):
+            dct.add(Ival(loc, loc + sz, v)) if v is not None else dct.remove(Ival(loc, loc + sz, None))
+        assert [tuple(i) for i in idict] == [tuple(i) for i in im if i.value is not None], (list(idict.d.items()))
+        lo = random.randint(0, lim - 1)
+        hi = random.randint(lo, lim)
+        assert [tuple(i) for i in idict[lo:hi]] == [tuple(i) for i in im[lo:hi] if i.value is not None]
+        check(random.randint(0, lim - 1))
+        loc = random.randint(0, lim - 1)
+        assert (idict[loc] or Ival(0, 0, None)).value == (cdict[loc] or Ival(0, 0, None)).value, loc
+
+    ivals = list(cdict)
+    assert not any(i.end == j.begin and i.value == j.value == 'a' for i, j in zip(ivals, ivals[1:]))
+    assert [(loc, (idict[loc] or Ival(0, 0, None)).value) for loc in range(lim)] ==\
+           [(loc, (cdict[loc] or Ival(0, 0, None)).value) for loc in range(lim)]
@@ -57,6 +57,8 @@ def _vcc_noop(vold, vnew, loc, sz):
     pass
 
 class IntervalMap:
+    _ival_type = None
+
     @classmethod
     def from_valued_interval_domain(cls, ival, *, coalescing=True, **kwds):
         imap = cls(ival.begin, ival.end - ival.begin, ival.value, coalescing=coalescing, **kwds)
@@ -82,15 +84,16 @@ class IntervalMap:
     def should_return_ivals(meth):
         def meth_return_ival(self, *args, **kwds):
             ret = meth(self, *args, **kwds)
-            if not hasattr(self, '_ival_type'):
+            ival_type = self._ival_type
+            if ival_type is None:
                 return ret
             if isinstance(ret, tuple):
                 (base, sz, v) = ret
-                return self._ival_type(base, base + sz, v)
+                return ival_type(base, base + sz, v)
             elif isinstance(ret, list):
-                return [self._ival_type(base, base + sz, v) for (base, sz, v) in ret]
+                return [ival_type(base, base + sz, v) for (base, sz, v) in ret]
             else:
-                return (self._ival_type(base, base + sz, v) for (base, sz, v) in ret)
+                return (ival_type(base, base + sz, v) for (base, sz, v) in ret)
         meth_return_ival.raw = meth
         return meth_return_ival
 
@@ -98,7 +101,7 @@ class IntervalMap:
     @should_return_ivals
     def get(self, loc, *, coalesce_with_values=set(), coalesce_with_self_and_values=set(),
                           coalesce_beyond_values=set(), coalesce_beyond_self_and_values=set()):
-        base, sz, v = self.__getitem__.raw(self, loc)
+        base, sz, v = self._span(loc)
         values_coalesced = set(coalesce_with_values)
         if coalesce_with_self_and_values:
             values_coalesced.update((v,))
@@ -112,36 +115,33 @@ class IntervalMap:
             values_allowed.update(coalesce_beyond_self_and_values)
         values_allowed.difference_update(values_coalesced)
 
+        # Walk left, then right, from a single bisection each, stepping through
+        # the sorted span bases
+        d = self.d
         backup = (base, sz, v)
-        basel, _, vl = (base, sz, v)
-        baser, szr, vr = (base, sz, v)
+        _v = v
         #print('base={0:x} sz={1:x} v={2} values_coalesced={3}'.format(base, sz, v, values_coalesced), file=sys.stderr)
-        try:
-            basel, _, vl = self.__getitem__.raw(self, basel - 1)
-            while vl in values_coalesced or vl in values_allowed:
-                base, sz = basel, base + sz - basel
-                if vl in values_coalesced:
-                    backup = (base, sz, v)
-                basel, _, vl = self.__getitem__.raw(self, basel - 1)
-                #print('basel={0:x} sz= vl={1}'.format(basel, vl), file=sys.stderr)
-        except ValueError:
-            pass
-        _, _, _v = self.__getitem__.raw(self, base)
+        for basel in d.irange(maximum=base, inclusive=(True, False), reverse=True):
+            (_, vl) = d[basel]
+            if vl not in values_coalesced and vl not in values_allowed:
+                break
+            base, sz, _v = basel, base + sz - basel, vl
+            if vl in values_coalesced:
+                backup = (base, sz, v)
+            #print('basel={0:x} sz= vl={1}'.format(basel, vl), file=sys.stderr)
         if _v not in values_coalesced and _v in values_allowed:
             base, sz, v = backup
 
         backup = (base, sz, v)
-        try:
-            baser, szr, vr = self.__getitem__.raw(self, baser + szr)
-            while vr in values_coalesced or vr in values_allowed:
-                sz = baser + szr - base
-                if vr in values_coalesced:
-                    backup = (base, sz, v)
-                baser, szr, vr = self.__getitem__.raw(self, baser + szr)
-                #print('baser={0:x} baser+szr={1:x} vr={2}'.format(baser, baser + szr, vr), file=sys.stderr)
-        except ValueError:
-            pass
-        _, _, _v = self.__getitem__.raw(self, base + sz - 1)
+        _v = v
+        for baser in d.irange(minimum=base + sz):
+            (szr, vr) = d[baser]
+            if vr not in values_coalesced and vr not in values_allowed:
+                break
+            sz, _v = baser + szr - base, vr
+            if vr in values_coalesced:
+                backup = (base, sz, v)
+            #print('baser={0:x} baser+szr={1:x} vr={2}'.format(baser, baser + szr, vr), file=sys.stderr)
         if _v not in values_coalesced and _v in values_allowed:
             base, sz, v = backup
 
@@ -169,17 +169,22 @@ class IntervalMap:
             if loc.stop is None:
                 loc = slice(loc.start, self._base + self._sz)
             try:
-                ret = [self.__getitem__.raw(self, loc.start), ]
+                ret = [self._span(loc.start), ]
             except ValueError:
                 ret = []
             ret.extend(((base, *d[base]) for base in
                          d.irange(loc.start, loc.stop, inclusive=(False, False))))
             return ret
         else:
-            if not self._base <= loc < self._base + self._sz:
-                raise ValueError(loc)
-            base = d.iloc[d.bisect_right(loc) - 1]
-            return (base, *d[base])
+            return self._span(loc)
+
+    # The (base, sz, v) span that contains loc
+    def _span(self, loc):
+        if not self._base <= loc < self._base + self._sz:
+            raise ValueError(loc)
+        d = self.d
+        base = d.keys()[d.bisect_right(loc) - 1]
+        return (base, *d[base])
 
 
     @should_return_ivals
@@ -188,10 +193,9 @@ class IntervalMap:
 
     def irange(self, start, stop):
         if not self._base <= start < self._base + self._sz:
-            raise StopIteration
+            return
         d = self.d
-        base = d.iloc[d.bisect_right(start) - 1]
-        yield (base, *d[base])
+        yield self._span(start)
 
         for base in d.irange(start, stop, inclusive=(False, False)) :
             yield (base, *d[base])
@@ -225,7 +229,7 @@ class IntervalMap:
         elif ix != 0 :
             # Not left-aligned.  Update our notion of self
             ix = ix - 1
-            k = d.iloc[ix]
+            k = d.keys()[ix]
             (szex, vex) = d[k]
 
             assert k < loc and k + szex > loc, 'Off the map (to the right?)'
@@ -320,22 +324,20 @@ class IntervalMap:
 
         if couldcright and self._coalescing:
             # print("PreRC", ix, d)
-            kr = d.iloc[ix+1]
+            kr = d.keys()[ix+1]
             (szr, vr) = d[kr]
             if vr == v:
-                del d.iloc[ix+1]
-                del d.iloc[ix]
+                del d[kr]
                 sz = sz + szr
                 d[loc] = (sz, v)
                 # print("RC", ix, d)
     
         if couldcleft and (self._coalescing or recursing):
             # print("PreLC", ix, d)
-            kl = d.iloc[ix-1]
+            kl = d.keys()[ix-1]
             (szl, vl) = d[kl]
             if vl == v:
-                del d.iloc[ix]
-                del d.iloc[ix-1]
+                del d[loc]
                 d[kl] = (szl+sz, v)
                 # print("LC", ix, d)
 
@@ -0,0 +1,49 @@
+import numpy
+
+# An IntervalSoA is a snapshot of sorted, disjoint address intervals laid out
+# as a structure of arrays: NumPy arrays of begins, ends and state codes,
+# which are the AddrIvalState values, or 0 for None.  overlapping() gives
+# another IntervalSoA viewing the same arrays.
+#
+# The state codes are single bits, so a set of states is tested for with a
+# mask: (states & state_mask(...)) != 0.  The code of a gap has no bits, so
+# it matches no mask.
+
+def state_code(state):
+    return state.value if state is not None else 0
+
+def state_mask(states):
+    return sum(s.value for s in set(states))
+
+class IntervalSoA:
+    def __init__(self, begins, ends, states):
+        self.begins = begins
+        self.ends = ends
+        self.states = states
+
+    @classmethod
+    def from_ivals(cls, ivals):
+        ivals = ivals if isinstance(ivals, list) else list(ivals)
+        n = len(ivals)
+        return cls(numpy.fromiter((i.begin for i in ivals), dtype=numpy.int64, count=n),
+                   numpy.fromiter((i.end for i in ivals), dtype=numpy.int64, count=n),
+                   numpy.fromiter((state_code(i.state) for i in ivals), dtype=numpy.int8, count=n))
+
+    def __len__(self):
+        return len(self.begins)
+
+    # The intervals that overlap [begin, end)
+    def overlapping(self, begin, end):
+        lo = numpy.searchsorted(self.ends, begin, side='right')
+        hi = numpy.searchsorted(self.begins, end, side='left')
+        return IntervalSoA(self.begins[lo:hi], self.ends[lo:hi], self.states[lo:hi])
+
+    # The intervals with each run of adjacent intervals of the same state
+    # merged into one
+    def coalesced(self):
+        if not len(self):
+            return self
+        breaks = (self.begins[1:] != self.ends[:-1]) | (self.states[1:] != self.states[:-1])
+        firsts = numpy.flatnonzero(numpy.concatenate(([True], breaks)))
+        lasts = numpy.append(firsts[1:] - 1, len(self) - 1)
+        return IntervalSoA(self.begins[firsts], self.ends[lasts], self.states[firsts])
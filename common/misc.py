@@ -1,5 +1,5 @@
-from intervaltree import Interval
-from enum import Enum, unique
+from collections import namedtuple
+from enum import Enum, IntFlag, unique
 
 # Publisher interface ------------------------------------------------- {{{
 
@@ -21,27 +21,24 @@ class Publisher:
 # --------------------------------------------------------------------- }}}
 # Address intervals representation ------------------------------------ {{{
 
+# Each state is a distinct bit, so that sets of states can be tested for as
+# bitmasks, e.g. over the NumPy arrays of an IntervalSoA
 @unique
-class AddrIvalState(Enum):
+class AddrIvalState(IntFlag):
     ALLOCD  = 1
     FREED   = 2
-    REVOKED = 3
+    REVOKED = 4
 
-    MAPD    = 4
-    UNMAPD  = 5
+    MAPD    = 8
+    UNMAPD  = 16
 
     __repr__ = Enum.__str__
+    __str__ = Enum.__str__
 
 
-class AddrIval(Interval):
+class AddrIval(namedtuple('AddrIval', ['begin', 'end', 'state'])):
     __slots__ = ()
 
-    def __new__(cls, begin, end, state):
-        return super().__new__(cls, begin, end, state)
-
-    @property
-    def state(self):
-        return self.data
     # For compatibility with the IntervalMap
     @property
     def value(self):
@@ -52,11 +49,9 @@ class AddrIval(Interval):
         return self.end - self.begin
 
     def __repr__(self):
-        r = super().__repr__()
-        r = r.replace('Interval', __class__.__name__, 1)
-        r = r.replace(str(self.begin), hex(self.begin)[2:])
-        r = r.replace(str(self.end), hex(self.end)[2:])
-        return r
+        if self.state is None:
+            return '{0}({1:x}, {2:x})'.format(__class__.__name__, self.begin, self.end)
+        return '{0}({1:x}, {2:x}, {3!r})'.format(__class__.__name__, self.begin, self.end, self.state)
 
     __str__ = __repr__
 
@@ -6,11 +6,12 @@ import sys
 def _discard(*args, **kwargs): pass
 
 class Run:
-    def __init__(self, file, *, trace_listeners=[], addr_space_sample_listeners=[]):
+    def __init__(self, file, *, trace_listeners=[], addr_space_sample_listeners=[], record_listeners=[]):
         self._file = file
 
         self._trace_listeners = list(set(trace_listeners))
         self._addr_space_sample_listeners = list(set(addr_space_sample_listeners))
+        self._record_listeners = list(set(record_listeners))
 
         self._record_types = dict()
         self.timestamp = 0
@@ -24,6 +25,11 @@ class Run:
     def register_addr_space_sample_listener(self, *l):
         self._addr_space_sample_listeners.extend(set(l) - set(self._addr_space_sample_listeners))
 
+    # Record listeners are notified after each trace record has been replayed
+    # to all the other listeners
+    def register_record_listener(self, *l):
+        self._record_listeners.extend(set(l) - set(self._record_listeners))
+
 
     @property
     def timestamp_ns(self):
@@ -63,6 +69,9 @@ class Run:
         elif rtype == 'call-trace':
             self._parse_call_trace(fields)
 
+        for rl in self._record_listeners:
+            rl.record_replayed()
+
     def replay(self):
         for line in self._file:
             if line.startswith('#'):
@@ -42,7 +42,9 @@ from sortedcontainers import SortedDict
 if __name__ == "__main__" and __package__ is None:
     sys.path.append(os.path.dirname(sys.path[0]))
 
+from common.intervaldict import IntervalDict
 from common.intervalmap import IntervalMap
+from common.intervalsoa import IntervalSoA, state_code, state_mask
 from common.misc import Publisher
 from common.misc import AddrIval, AddrIvalState
 from common.run import Run
@@ -127,49 +129,53 @@ class BaseAddrSpaceModel:
     def sweep_size_mb(self):
         return self.sweep_size // 2**20
 
-    def aspace_sampled(self, event, size, sweep_size):
+    def aspace_sampled(self, event:dict, size:int, sweep_size:int):
         self.size = size
         self.sweep_size = sweep_size
         output.update()
 
 
 class BaseIntervalAddrSpaceModel(BaseAddrSpaceModel):
-    def __init__(self, *, calc_total_for_state):
+    def __init__(self, *, calc_total_for_state, coalescing_states=()):
         super().__init__()
-        self.__addr_ivals = IntervalMap.from_valued_interval_domain(AddrIval(0, 2**64, None))
+        self._addr_ivals = IntervalDict(AddrIval, coalescing_values=coalescing_states)
         self._total = 0
         self._calc_total_for_state = calc_total_for_state
 
 
-    def _update(self, ival):
-        overlaps_old = self.__addr_ivals[ival.begin-1 : ival.end+1]
-        total_old = sum(i.size for i in overlaps_old if i.state is self._calc_total_for_state)
+    # Paints ival onto the address space, or clears it if its state is None.
+    # The new interval replaces whatever it overlaps, and coalescing does not
+    # change the total, so only the overlapped bytes need accounting.
+    def _update(self, ival:AddrIval):
+        state = self._calc_total_for_state
+        total_old = 0
+        for i in self._addr_ivals[ival.begin : ival.end]:
+            if i.state is state:
+                total_old += min(i.end, ival.end) - max(i.begin, ival.begin)
 
-        self.__addr_ivals.add(ival)
+        if ival.state is not None:
+            self._addr_ivals.add(ival)
+        else:
+            self._addr_ivals.remove(ival)
 
-        overlaps_new = self.__addr_ivals[ival.begin-1 : ival.end+1]
-        total_new = sum(i.size for i in overlaps_new if i.state is self._calc_total_for_state)
+        total_new = ival.size if ival.state is state else 0
         self._total += total_new - total_old
         output.update()
 
 
+    # The intervals in [begin, end), with adjacent intervals of the same state
+    # coalesced
     def addr_ivals_coalesced_sorted(self, begin=None, end=None):
-        if begin is not None and end is not None:
-            return [i for i in self.__addr_ivals[begin:end] if i.value is not None]
-        else:
-            return [i for i in self.__addr_ivals if i.value is not None]
-
-    def addr_ival_coalesced(self, point, **kwds):
-        i = self.__addr_ivals.get(point, **kwds)
-        return i if i.value is not None else None
+        return IntervalSoA.from_ivals(self._addr_ivals[begin:end]).coalesced()
 
 
 class AllocatedAddrSpaceModel(BaseIntervalAddrSpaceModel, Publisher):
     def __init__(self):
+        # No state coalesces: each interval keeps the bounds of the allocation,
+        # free or revocation that painted it, which frees and reallocs that
+        # land in revoked memory rely on
         super().__init__(calc_total_for_state=AddrIvalState.ALLOCD)
-        bkg_ival = AddrIval(0, 2**64, None)
-        self.__addr_ivals = IntervalMap.from_valued_interval_domain(bkg_ival, coalescing=False)
-        self._realloc_stubs = IntervalMap.from_valued_interval_domain(bkg_ival)
+        self._realloc_stubs = IntervalMap.from_valued_interval_domain(AddrIval(0, 2**64, None))
 
 
     @property
@@ -177,24 +183,19 @@ class AllocatedAddrSpaceModel(BaseIntervalAddrSpaceModel, Publisher):
         return self._total
 
 
-    def allocd(self, event, begin, end):
+    def allocd(self, event:dict, begin:int, end:int):
         interval = AddrIval(begin, end, AddrIvalState.ALLOCD)
         overlaps = self.addr_ivals_sorted(begin, end)
         overlaps_allocd = [o for o in overlaps if o.state is AddrIvalState.ALLOCD]
         overlaps_freed = [o for o in overlaps if o.state is AddrIvalState.FREED]
         overlaps_stubs = [o for o in self._realloc_stubs[begin:end] if o.state is AddrIvalState.FREED]
         if overlaps_allocd:
-            oa = overlaps_allocd
             logger.warning('%d\tW: New allocation %s overlaps existing allocations %s, chopping them out',
                  run.timestamp, interval, overlaps_allocd)
-            for o in oa:
-                self.__addr_ivals.remove(o)
-            if oa[0].contains_point(interval.begin):
-                left_stub = AddrIval(oa[0].begin, interval.begin, AddrIvalState.ALLOCD)
-                self.__addr_ivals.add(left_stub)
-            if oa[-1].contains_point(interval.end):
-                right_stub = AddrIval(interval.end, oa[-1].end, AddrIvalState.ALLOCD)
-                self.__addr_ivals.add(right_stub)
+            # Chop them out before any reuse is published, so that subscribers
+            # only see their stubs either side of the new allocation
+            for o in overlaps_allocd:
+                self._update(AddrIval(max(o.begin, begin), min(o.end, end), None))
 
         if overlaps_stubs:
             err_fmt  = '%d\t%s: New allocation %s reuses old allocation stub from realloc '\
@@ -214,11 +215,10 @@ class AllocatedAddrSpaceModel(BaseIntervalAddrSpaceModel, Publisher):
                           "by --exit-on-reuse" + suggest, run.timestamp, interval, overlaps_freed)
                 sys.exit(1)
             self._publish('reused', event, begin, end)
-        super()._update(interval)
-        self.__addr_ivals.add(interval)
+        self._update(interval)
 
 
-    def reallocd(self, event, begin_old, begin_new, end_new):
+    def reallocd(self, event:dict, begin_old:int, begin_new:int, end_new:int):
         interval_old = self.addr_ival(begin_old)
         if not interval_old:
             logger.warning('%d\tW: No existing allocation to realloc at %x, doing just alloc',
@@ -237,8 +237,7 @@ class AllocatedAddrSpaceModel(BaseIntervalAddrSpaceModel, Publisher):
         # made safe.
         interval_new = AddrIval(begin_new, end_new, AddrIvalState.ALLOCD)
         if interval_new.begin == interval_old.begin:
-            super()._update(AddrIval(interval_old.begin, interval_old.end, None))
-            self.__addr_ivals.remove(interval_old)
+            self._update(AddrIval(interval_old.begin, interval_old.end, None))
             if interval_new.size < interval_old.size:
                 ival_old_stub = AddrIval(interval_new.end, interval_old.end, AddrIvalState.FREED)
                 self._realloc_stubs.add(ival_old_stub)
@@ -249,7 +248,7 @@ class AllocatedAddrSpaceModel(BaseIntervalAddrSpaceModel, Publisher):
         self.allocd(event, begin_new, end_new)
 
 
-    def freed(self, event, begin):
+    def freed(self, event:dict, begin:int):
         interval = self.addr_ival(begin)
         if interval:
             if begin != interval.begin or interval.state is not AddrIvalState.ALLOCD:
@@ -259,11 +258,10 @@ class AllocatedAddrSpaceModel(BaseIntervalAddrSpaceModel, Publisher):
             logger.warning('%d\tW: No existing allocation to free at %x, defaulting to one of size 1',
                   run.timestamp, begin)
             interval = AddrIval(begin, begin + 1, AddrIvalState.FREED)
-        super()._update(interval)
-        self.__addr_ivals.add(interval)
+        self._update(interval)
 
 
-    def revoked(self, event, *bes):
+    def revoked(self, event:dict, *bes):
         if not isinstance(bes[0], tuple):
             bes = [(bes[0], bes[1])]
         query_and_overlaps = [((b, e), self.addr_ivals_sorted(b, e)) for b, e in bes]
@@ -313,46 +311,36 @@ class AllocatedAddrSpaceModel(BaseIntervalAddrSpaceModel, Publisher):
 
         for begin, end in (s for s in spans_to_mark_revoked if s is not None):
             ival = AddrIval(begin, end, AddrIvalState.REVOKED)
-            super()._update(ival)
-            self.__addr_ivals.add(ival)
+            self._update(ival)
             self._realloc_stubs.remove(ival)
 
 
     def addr_ivals_sorted(self, begin=None, end=None):
-        return [i for i in self.__addr_ivals[begin:end] if i.value is not None]
+        return self._addr_ivals[begin:end]
 
-    def addr_ival(self, point, **kwds):
-        i = self.__addr_ivals.get(point, **kwds)
-        return i if i.value is not None else None
+    def addr_ival(self, point:int, **kwds):
+        return self._addr_ivals.get(point, **kwds)
 
 
+    # The distinct intervals coalesced around each of the sorted ivals, looked
+    # up with the same options as addr_ival()
     def coalesce_sorted_ivals(self, ivals_sorted:list, **kwds):
-        ivals = ivals_sorted
-        ivals.reverse()
-        olaps_coalesced = []
-
-        while ivals:
-            ival = self.addr_ival(ivals.pop().begin, **kwds)
-            olaps_coalesced.append(ival)
-            while ivals and ival.end >= ivals[-1].begin:
-                assert ival.end > ivals[-1].begin, '{0} failed to coalesce with {1}'.format(ival, ivals[-1])
-                ivals.pop()
-
-        return olaps_coalesced
+        return self._addr_ivals.get_sorted([i.begin for i in ivals_sorted], **kwds)
 
 
 class MappedAddrSpaceModel(BaseIntervalAddrSpaceModel):
     def __init__(self):
-        super().__init__(calc_total_for_state=AddrIvalState.MAPD)
+        super().__init__(calc_total_for_state=AddrIvalState.MAPD,
+                         coalescing_states=(AddrIvalState.MAPD, AddrIvalState.UNMAPD))
 
     @property
     def mapd_size(self):
         return self._total
 
-    def mapd(self, event, begin, end, _):
+    def mapd(self, event:dict, begin:int, end:int, _):
         self._update(AddrIval(begin, end, AddrIvalState.MAPD))
 
-    def unmapd(self, event, begin, end):
+    def unmapd(self, event:dict, begin:int, end:int):
         self._update(AddrIval(begin, end, AddrIvalState.UNMAPD))
 
 
@@ -360,10 +348,10 @@ class AllocatorMappedAddrSpaceModel(MappedAddrSpaceModel):
     '''Tracks mapped/unmapped by the allocator for internal use'''
 
     @staticmethod
-    def call_is_from_allocator(callstack):
+    def call_is_from_allocator(callstack:str):
        return any(callstack.find(frame) >= 0 for frame in ('malloc', 'calloc', 'realloc', 'free'))
 
-    def mapd(self, event, begin, end, prot):
+    def mapd(self, event:dict, begin:int, end:int, prot:int):
         if prot == 0b11 and AMAS.call_is_from_allocator(event['callstack']):
             self._update(AddrIval(begin, end, AddrIvalState.MAPD))
 
@@ -378,30 +366,29 @@ class AccountingAllocatedAddrSpaceModel(BaseAddrSpaceModel):
         self.allocd_size = 0
         self.mapd_size = 0
 
-    def mapd(self, event, begin, end, prot):
+    def mapd(self, event:dict, begin:int, end:int, prot:int):
         if prot == 0b11 and AMAS.call_is_from_allocator(event['callstack']):
             self.mapd_size += end - begin
         output.update()
-    def unmapd(self, event, begin, end):
+    def unmapd(self, event:dict, begin:int, end:int):
         if AMAS.call_is_from_allocator(event['callstack']):
             self.mapd_size -= end - begin
 
-    def allocd(self, event, begin, end):
+    def allocd(self, event:dict, begin:int, end:int):
         sz = end - begin
         self._va2sz[begin] = sz
         self.allocd_size += sz
         output.update()
-    def freed(self, event, begin):
-        sz = self._va2sz.get(begin)
+    def freed(self, event:dict, begin:int):
+        sz = self._va2sz.pop(begin, None)
         if sz is not None :
             self.allocd_size -= sz
-            del self._va2sz[begin]
-    def reallocd(self, event, obegin, nbegin, nend):
+    def reallocd(self, event:dict, obegin:int, nbegin:int, nend:int):
         self.freed(event, obegin)
         self.allocd(event, nbegin, nend)
 
 class AllocatedAddrSpaceModelSubscriber:
-    def reused(self, alloc_state, event, begin, end):
+    def reused(self, alloc_state, event:dict, begin:int, end:int):
         raise NotImplementedError
 
 
@@ -427,7 +414,7 @@ class BaseSweepingRevoker(AllocatedAddrSpaceModelSubscriber):
         self._sweep(addr_space.sweep_size, [AddrIval(b, e, AddrIvalState.FREED) for b, e in bes])
 
 
-    def _sweep(self, amount, addr_ivals):
+    def _sweep(self, amount:int, addr_ivals:list):
         rounds = len(addr_ivals) // self._sweep_capacity_ivals +\
                  (len(addr_ivals) % self._sweep_capacity_ivals != 0)
         if rounds > 1:
@@ -438,14 +425,21 @@ class BaseSweepingRevoker(AllocatedAddrSpaceModelSubscriber):
         self.swept += amount * rounds
         self.swept_ivals += len(addr_ivals)
         sd = self.sweeps_dist
-        sd[sd.iloc[sd.bisect_right(len(addr_ivals) % self._sweep_capacity_ivals) - 1]] += 1
+        sd[self._sweeps_dist_key(len(addr_ivals) % self._sweep_capacity_ivals)] += 1
         if rounds > 1:
-            sd[sd.iloc[sd.bisect_right(self._sweep_capacity_ivals) - 1]] += rounds - 1
+            sd[self._sweeps_dist_key(self._sweep_capacity_ivals)] += rounds - 1
         output.update()
 
+    @staticmethod
+    def _sweeps_dist_key(n:int):
+        # The greatest power of two in sweeps_dist that is not above n;
+        # n == 0 falls into the last one.
+        e = n.bit_length() - 1
+        return 1 << (e if 0 <= e < 20 else 19)
+
 
 class SimpleSweepingRevoker(BaseSweepingRevoker):
-    def reused(self, alloc_state, event, begin, end):
+    def reused(self, alloc_state, event:dict, begin:int, end:int):
         intervals = [i for i in alloc_state.addr_ivals_sorted(begin, end) if i.state is AddrIvalState.FREED]
         if intervals:
             self._sweep(addr_space.sweep_size, intervals)
@@ -455,7 +449,7 @@ class SimpleSweepingRevoker(BaseSweepingRevoker):
 
 
 class CompactingSweepingRevoker(BaseSweepingRevoker):
-    def reused(self, alloc_state, event, begin, end):
+    def reused(self, alloc_state, event:dict, begin:int, end:int):
         overlaps = [i for i in alloc_state.addr_ivals_sorted(begin, end) if i.state is AddrIvalState.FREED]
         how_coalesce = {'coalesce_with_self_and_values': (AddrIvalState.REVOKED,),
                         'coalesce_beyond_values': (None,)}
@@ -515,7 +509,7 @@ class ColouringRevoker(AllocatedAddrSpaceModelSubscriber):
         return self._sweeping_revoker.sweeps_dist
 
 
-    def reused(self, alloc_state, event, begin, end):
+    def reused(self, alloc_state, event:dict, begin:int, end:int):
         # Query for colour intervals in the range.
         # Trim result so that no colour interval expands beyond the range being reused.
         # Calculate the range's new colour.
@@ -590,13 +584,17 @@ class ColouringRevoker(AllocatedAddrSpaceModelSubscriber):
 
 class BaseOutput:
     def rate_limited_runms(call_period_ms):
+        # The method runs once the run's timestamp is over call_period_ms past
+        # its last run, in whole ms; that is turned into a threshold against
+        # the raw ns timestamp, so that a call that is skipped costs just the
+        # one comparison.
         def _rate_limited_ms(meth):
-            call_last_ms = 0
+            next_call_ns = 0
             def rate_limited_meth(self, *args):
-                nonlocal call_last_ms
-                if call_last_ms == 0 or run.timestamp_ms - call_last_ms > call_period_ms:
+                nonlocal next_call_ns
+                if run.timestamp >= next_call_ns:
                     meth(self, *args)
-                    call_last_ms = run.timestamp_ms
+                    next_call_ns = (run.timestamp // 10**6 + call_period_ms + 1) * 10**6
             return rate_limited_meth
         return _rate_limited_ms
 
@@ -612,7 +610,23 @@ class BaseOutput:
         return _rate_limited_run_alloc_api_calls
 
 
+    # The model calls update() whenever its state changes, which may be
+    # several times per trace record; that only marks the output dirty.  The
+    # output is brought up to date by flush(), once per trace record.
+    _dirty = False
+
     def update(self):
+        self._dirty = True
+
+    def flush(self):
+        if self._dirty:
+            self._dirty = False
+            self._update()
+
+    def record_replayed(self):
+        self.flush()
+
+    def _update(self):
         raise NotImplementedError
 
     def end(self):
@@ -634,9 +648,9 @@ class CompositeOutput(BaseOutput):
         super().__init__()
         self._outputs = outputs
 
-    def update(self):
+    def _update(self):
         for o in self._outputs:
-            o.update()
+            o._update()
 
     def end(self):
         for o in self._outputs:
@@ -655,7 +669,7 @@ class GraphOutput(FileOutput):
               file=self._file)
 
     @BaseOutput.rate_limited_runms(100)
-    def update(self):
+    def _update(self):
         print('{0}\t{1}\t{2}\t{3}\t{4}\t{5}\t{6}\t{7}\t{8}'.format(run.timestamp, addr_space.size,
               addr_space.sweep_size, alloc_addr_space.mapd_size, alloc_state.allocd_size, revoker.sweeps,
               revoker.swept, revoker.swept_ivals, ' '.join(str(v) for v in revoker.sweeps_dist.values())),
@@ -667,15 +681,18 @@ class AllocationMapOutput(FileOutput, AllocatedAddrSpaceModelSubscriber):
 
     POOL_MAP_RESOLUTION_IN_SYMBOLS = 60
 
+    _FREED_LIKE_MASK = state_mask((AddrIvalState.MAPD, AddrIvalState.UNMAPD,
+                                   AddrIvalState.FREED, AddrIvalState.REVOKED))
+
 
     def __init__(self, *args):
         super().__init__(*args)
-        self._addr_ivals_reused = IntervalTree()
+        self._addr_ivals_reused = []
         alloc_state.register_subscriber(self)
 
 
-    def reused(self, alloc_state, event, begin, end):
-        self._addr_ivals_reused.add(AddrIval(begin, end, None))
+    def reused(self, alloc_state, event:dict, begin:int, end:int):
+        self._addr_ivals_reused.append((begin, end))
 
 
     # XXX-LPT _output_header
@@ -683,58 +700,109 @@ class AllocationMapOutput(FileOutput, AllocatedAddrSpaceModelSubscriber):
 
 
     @BaseOutput.rate_limited_runms(100)
-    def update(self):
-        pools = self._get_memory_pools()
+    def _update(self):
+        ivals = alloc_state.addr_ivals_coalesced_sorted()
+        (pool_begins, pool_ends) = self._get_memory_pools(ivals)
+
+        # The intervals reused since the last update, sorted by begin, and the
+        # running maximum of their ends: an interval reused before ce reaches
+        # beyond cb iff the last such maximum does.
+        reused = numpy.array(self._addr_ivals_reused, dtype=numpy.int64).reshape(-1, 2)
+        reused = reused[numpy.argsort(reused[:, 0], kind='stable')]
+        reused = (reused[:, 0], numpy.maximum.accumulate(reused[:, 1]))
 
         print('---', file=self._file)
-        for p in pools:
-            chunk_size, rem = p.size // AllocationMapOutput.POOL_MAP_RESOLUTION_IN_SYMBOLS,\
-                              p.size % AllocationMapOutput.POOL_MAP_RESOLUTION_IN_SYMBOLS
-            chunk_size, rem = (chunk_size, rem) if chunk_size > 0 else (p.size, 0)
-            chunk_offsets = itertools.chain(range(0, rem * (chunk_size+1), chunk_size+1),
-                                            range(rem * (chunk_size+1), p.size, chunk_size))
-            chunks = [p.begin + co for co in chunk_offsets]
-            chunk_states = (self._chunk_state(cb, ce) for cb, ce in
-                            itertools.zip_longest(chunks, chunks[1:], fillvalue=p.end));
-            chunk_states_str = ''.join(chunk_states)
-            print('{0:x}-{1:x} {2:s} {3:d}'.format(p.begin, p.end, chunk_states_str, chunk_size), file=self._file)
+        if len(pool_begins):
+            # The chunks of all the pools are classified at once, along with
+            # the gaps between the pools, which are then skipped
+            (bounds, chunk_sizes, firsts, nchunks) = self._get_pool_chunks(pool_begins, pool_ends)
+            ivals = ivals.overlapping(pool_begins[0], pool_ends[-1])
+            chunk_states = self._chunk_states(ivals, bounds, reused)
+            for b, e, cs, f, n in zip(pool_begins, pool_ends, chunk_sizes, firsts, nchunks):
+                print('{0:x}-{1:x} {2:s} {3:d}'.format(b, e, ''.join(chunk_states[f:f + n]), cs), file=self._file)
 
-        self._addr_ivals_reused.clear()
+        self._addr_ivals_reused = []
 
 
     @staticmethod
-    def _get_memory_pools():
-        ivals = [i for i in alloc_state.addr_ivals_coalesced_sorted() if i.state is not AddrIvalState.UNMAPD]
-        ivals.reverse()
-
-        pools = []
-        while ivals:
-            pool = []
-            pool.append(ivals.pop())
-            while ivals and (ivals[-1].begin - pool[-1].end < AllocationMapOutput.POOL_MAX_ARTIFICIAL_GROWTH):
-                assert pool[-1].end <= ivals[-1].begin, 'Bug: overlapping intervals {0} {1}'\
-                                                        .format(pool[-1], ivals[-1])
-                pool.append(ivals.pop())
-            pools.append(AddrIval(pool[0].begin, pool[-1].end, None))
-
-        return pools
-
-
-    def _chunk_state(self, cbegin, cend):
-        #print('{0:x}-{1:x}'.format(cbegin, cend), file=self._file)
-        csize = cend - cbegin
-        coverlaps = alloc_state.addr_ivals_coalesced_sorted(cbegin, cend)
-        if self._addr_ivals_reused.search(cbegin, cend):
-            chunk_stat = '~'   # 'reused'  (could be just partially)
-        elif all(i.state in (AddrIvalState.MAPD, AddrIvalState.UNMAPD,
-                              AddrIvalState.FREED, AddrIvalState.REVOKED) for i in coverlaps):
-            chunk_stat = '0'   # 'freed'
-        elif all((i.state is AddrIvalState.ALLOCD) for i in coverlaps) and\
-             sum((min(i.end, cend) - max(i.begin, cbegin)) for i in coverlaps) >= 0.80 * csize:
-            chunk_stat = '#'   # 'allocd'
+    def _get_memory_pools(ivals:IntervalSoA):
+        keep = ivals.states != state_code(AddrIvalState.UNMAPD)
+        begins, ends = ivals.begins[keep], ivals.ends[keep]
+        if not len(begins):
+            return (begins, ends)
+
+        # Pools are split wherever intervals are too far apart to be merged
+        gaps = begins[1:] - ends[:-1]
+        assert (gaps >= 0).all(), 'Bug: overlapping intervals'
+        splits = numpy.flatnonzero(gaps >= AllocationMapOutput.POOL_MAX_ARTIFICIAL_GROWTH) + 1
+        pool_begins = begins[numpy.concatenate(([0], splits))]
+        pool_ends = ends[numpy.concatenate((splits - 1, [len(ends) - 1]))]
+        return (pool_begins, pool_ends)
+
+
+    # The chunks of the pools [pool_begins[i], pool_ends[i]), which are as even
+    # as they can be: a pool is split into POOL_MAP_RESOLUTION_IN_SYMBOLS chunks
+    # of chunk_sizes[i] bytes, the first ones of which are a byte larger to make
+    # up the remainder, or into a single chunk if it is smaller than that.  The
+    # bounds of all the chunks are laid out in one array, so that the chunks of
+    # pool i are the nchunks[i] chunks from the index firsts[i], and each pool's
+    # last chunk is followed by the gap to the next pool.
+    @staticmethod
+    def _get_pool_chunks(pool_begins:numpy.ndarray, pool_ends:numpy.ndarray):
+        res = AllocationMapOutput.POOL_MAP_RESOLUTION_IN_SYMBOLS
+        sizes = pool_ends - pool_begins
+        whole = sizes >= res
+        nchunks = numpy.where(whole, res, 1)
+        chunk_sizes = numpy.where(whole, sizes // res, sizes)
+        rems = numpy.where(whole, sizes % res, 0)
+
+        firsts = numpy.cumsum(nchunks + 1) - (nchunks + 1)
+        pools = numpy.repeat(numpy.arange(len(sizes)), nchunks + 1)
+        ixs = numpy.arange(len(pools)) - firsts[pools]
+        bounds = pool_begins[pools] + ixs * chunk_sizes[pools] + numpy.minimum(ixs, rems[pools])
+        return (bounds, chunk_sizes, firsts, nchunks)
+
+
+    # The map symbols of the chunks [bounds[i], bounds[i+1]), over which ivals
+    # lie.  As the intervals are sorted and disjoint, those of a state overlap
+    # a chunk iff they begin before its end and do not end before its begin,
+    # so the overlaps are counted from two bisections per chunk.  Likewise,
+    # the allocated bytes below a bound are the sizes of the allocated
+    # intervals ending before it, summed up in advance, plus the part of any
+    # interval straddling it, and the chunks' allocated bytes are differences
+    # of those.
+    @staticmethod
+    def _chunk_states(ivals:IntervalSoA, bounds:numpy.ndarray, reused:tuple):
+        (cbegins, cends) = (bounds[:-1], bounds[1:])
+        def noverlaps(which):
+            return numpy.searchsorted(ivals.begins[which], cends, side='left') -\
+                   numpy.searchsorted(ivals.ends[which], cbegins, side='right')
+
+        allocd = ivals.states == state_code(AddrIvalState.ALLOCD)
+        freed_like = (ivals.states & AllocationMapOutput._FREED_LIKE_MASK) != 0
+        # A sentinel interval beyond all the bounds caps the straddled index
+        abegins = numpy.append(ivals.begins[allocd], numpy.iinfo(numpy.int64).max)
+        aends = ivals.ends[allocd]
+        asizes_below = numpy.concatenate(([0], numpy.cumsum(aends - abegins[:-1])))
+        def allocd_below(x):
+            ixs = numpy.searchsorted(aends, x, side='right')
+            return asizes_below[ixs] + numpy.maximum(x - abegins[ixs], 0)
+
+        csizes = cends - cbegins
+        (reused_begins, reused_ends_max) = reused
+        if len(reused_begins):
+            rixs = numpy.searchsorted(reused_begins, cends, side='left') - 1
+            chunk_reused = (rixs >= 0) & (reused_ends_max[numpy.maximum(rixs, 0)] > cbegins)
         else:
-            chunk_stat = '='   # 'fragmented'
-        return chunk_stat
+            chunk_reused = numpy.zeros(len(csizes), dtype=bool)
+        chunk_freed = noverlaps(~freed_like) == 0
+        chunk_allocd = (noverlaps(~allocd) == 0) &\
+                       (allocd_below(cends) - allocd_below(cbegins) >= 0.80 * csizes)
+        return numpy.select((chunk_reused,  # 'reused'  (could be just partially)
+                             chunk_freed,   # 'freed'
+                             chunk_allocd), # 'allocd'
+                            ('~', '0', '#'),
+                            '=')            # 'fragmented'
 
 
 class SweepEventsOutput(FileOutput):
@@ -750,7 +818,7 @@ class SweepEventsOutput(FileOutput):
         print('#{0}\t{1}'.format('eventstamp-alloc-api-calls-malloc-calloc-aligned_alloc-posix_memalign-realloc-free',
               'sweep-amount-b'), file=self._file)
 
-    def update(self):
+    def _update(self):
         if self._revoker_state_last != revoker.swept:
             sweep = revoker.swept - self._revoker_state_last
             print('{0}\t{1}'.format(run.alloc_api_calls, sweep), file=self._file)
@@ -777,10 +845,10 @@ class RenderedAllocationMapOutput(DirectoryOutput):
 
     def __init__(self, dir, period, geom):
         super().__init__(dir)
-        self.update = BaseOutput.rate_limited_run_alloc_api_calls(period)(self.update)
+        self._update = BaseOutput.rate_limited_run_alloc_api_calls(period)(self._update)
         self._geom = geom
 
-    def update(self):
+    def _update(self):
         addr_ivals = alloc_state.addr_ivals_sorted()
         if not addr_ivals:
             return
@@ -812,9 +880,9 @@ class RenderedAllocationMapOutput(DirectoryOutput):
 class FreedAddrIvalsHistogramOutput(DirectoryOutput):
     def __init__(self, dir, period):
         super().__init__(dir)
-        self.update = BaseOutput.rate_limited_run_alloc_api_calls(period)(self.update)
+        self._update = BaseOutput.rate_limited_run_alloc_api_calls(period)(self._update)
 
-    def update(self) :
+    def _update(self) :
         ivals_freed = [i for i in alloc_state.addr_ivals_sorted() if i.state is AddrIvalState.FREED]
         if not ivals_freed:
           return
@@ -938,6 +1006,8 @@ if args.freed_addr_ivals_histogram_output:
                                                             args.freed_addr_ivals_histogram_period)
     output = CompositeOutput(output, freed_spans_hist_output)
 
+run.register_record_listener(output)
 run.replay()
 output.update()  # ensure at least one output update
+output.flush()
 output.end()
@@ -29,9 +29,11 @@ class MetadataTracker() :
         self._sfree   = 0
         self._nextoid = 1
         self._tva2oid = {}  # OIDs
-        self._oid2amd = {}  # Allocation metadata (stack, timestamp, size)
-        self._oid2irt = {}  # Initial Reallocation Timestamp & sftf
-        self._oid2rmd = {}  # most recent Reallocation metadata (stk, ts, osz, nsz)
+        # Per-object metadata, as a record of [amd, irt, rmd] for each live OID:
+        #   amd  Allocation metadata (stack, timestamp, size)
+        #   irt  Initial Reallocation Timestamp & sftf
+        #   rmd  most recent Reallocation metadata (stk, ts, osz, nsz)
+        self._oid2md  = {}
         self._tslam   = tslam
         self._istk    = istk
         self._ia      = ia  # Insert Allocation   (on free)
@@ -41,7 +43,7 @@ class MetadataTracker() :
         oid = self._nextoid
         self._nextoid += 1
         self._tva2oid[tva] = oid
-        self._oid2amd[oid] = [stk, tid, now, sz]
+        self._oid2md[oid] = [[stk, tid, now, sz], None, None]
 
         return oid
 
@@ -54,8 +56,7 @@ class MetadataTracker() :
             logging.warn("malloc inserting free for tva=%x at ts=%d", begin, now)
             self.freed("", begin)
 
-        oid = self._allocd(stk, tid, begin, end-begin, now)
-        self._oid2rmd[oid]   = None
+        self._allocd(stk, tid, begin, end-begin, now)
 
     def freed(self, stk, tid, begin) :
         now = self._tslam()
@@ -70,11 +71,9 @@ class MetadataTracker() :
                              begin, now)
             return
 
-        amd = self._oid2amd.pop(oid)
-        irt = self._oid2irt.pop(oid, (None, self._sfree))
-        self._ia(oid, amd, irt, now, tid)
+        (amd, irt, rmd) = self._oid2md.pop(oid)
+        self._ia(oid, amd, irt or (None, self._sfree), now, tid)
 
-        rmd = self._oid2rmd.pop(oid, None)
         if rmd is not None:
             self._ir(oid, rmd, now, self._sfree)
             # Free most recently reallocated size
@@ -96,20 +95,21 @@ class MetadataTracker() :
         if oid is None :
             # allocation via realloc or damaged trace
             oid = self._allocd(stk, tid, ntva, nsz, now)
-            self._oid2rmd[oid] = (stk, tid, now, 0, nsz)
+            self._oid2md[oid][2] = (stk, tid, now, 0, nsz)
         elif etva == ntva :
             # free via realloc
             self.freed(None, otva)
         else :
-            rmd = self._oid2rmd.pop(oid, None)
+            md = self._oid2md[oid]
+            rmd = md[2]
             osz = None
             if rmd is not None :
                 self._ir(oid, rmd, now, self._sfree)
                 osz = rmd[4]
             else :
-                osz = self._oid2amd[oid][3]
-                self._oid2irt[oid] = (now, self._sfree)
-            self._oid2rmd[oid] = (stk, tid, now, osz, nsz)
+                osz = md[0][3]
+                md[1] = (now, self._sfree)
+            md[2] = (stk, tid, now, osz, nsz)
             self._tva2oid[ntva] = oid
             self._sfree += osz
 
@@ -153,6 +153,10 @@ if __name__ == "__main__" and __package__ is None:
     sys.exit(-1)
 
   con = sqlite3.connect(args.database)
+  # The database is built from scratch and can be rebuilt from the trace,
+  # so trade durability of the latest transactions for fewer syncs
+  con.execute("PRAGMA journal_mode=WAL")
+  con.execute("PRAGMA synchronous=NORMAL")
   con.execute("CREATE TABLE stacks "
               "(stkid INTEGER PRIMARY KEY NOT NULL"
               ", stk TEXT UNIQUE NOT NULL)")
@@ -197,29 +201,44 @@ if __name__ == "__main__" and __package__ is None:
                 ", value NOT NULL"
                 ")")
 
+    # Rows are buffered and inserted in batches of up to nbatch
+    nbatch = 10000
+
     na = 0
+    arows = []
     def ia(oid, amd, irtf, fts, ftid) :
       global na
       (astk, atid, ats, asz) = amd
       (irt, sftf) = irtf
       stkid = istk(astk)
-      con.execute("INSERT INTO allocs "
-                  "(oid,atid,sz,stkid,ats,rts,fts,ftid,sftf) VALUES (?,?,?,?,?,?,?,?,?)",
-                  (oid,atid,asz,stkid,ats,irt,fts,ftid,sftf)
-      )
+      arows.append((oid,atid,asz,stkid,ats,irt,fts,ftid,sftf))
+      if len(arows) >= nbatch : flush_ia()
       na += 1
 
+    def flush_ia() :
+      con.executemany("INSERT INTO allocs "
+                      "(oid,atid,sz,stkid,ats,rts,fts,ftid,sftf) VALUES (?,?,?,?,?,?,?,?,?)",
+                      arows
+      )
+      arows.clear()
+
     nr = 0
+    rrows = []
     def ir(oid, rmd, fts, sftf) :
       global nr
       (rstk, rtid, rts, rosz, rnsz) = rmd
       stkid = istk(rstk)
-      con.execute("INSERT INTO reallocs "
-                  "(oid,rtid,osz,nsz,stkid,ats,fts,sftf) VALUES (?,?,?,?,?,?,?,?)",
-                  (oid,rtid,rosz,rnsz,stkid,rts,fts,sftf)
-      )
+      rrows.append((oid,rtid,rosz,rnsz,stkid,rts,fts,sftf))
+      if len(rrows) >= nbatch : flush_ir()
       nr += 1
 
+    def flush_ir() :
+      con.executemany("INSERT INTO reallocs "
+                      "(oid,rtid,osz,nsz,stkid,ats,fts,sftf) VALUES (?,?,?,?,?,?,?,?)",
+                      rrows
+      )
+      rrows.clear()
+
   run = Run(sys.stdin)
 
   if args.just_stacks :
@@ -236,6 +255,8 @@ if __name__ == "__main__" and __package__ is None:
 
     at._tslam = lambda : None
     at.finish()
+    flush_ia()
+    flush_ir()
 
     con.execute(kviq, ("nallocs", na))
     con.execute(kviq, ("nreallocs", nr))